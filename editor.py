@@ -3,30 +3,101 @@
 import cv2
 import json
 import numpy as np
-from moviepy.editor import VideoFileClip, ImageSequenceClip
+from moviepy.editor import VideoFileClip
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
-from PIL import Image, ImageTk
 import threading
 import os
 import subprocess
+import queue
+import shutil
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+import tempfile
+from scipy.signal import lfilter
+from ffmpeg_pipe import FFmpegReader, FFmpegWriter, H264_ENCODERS, run_ffmpeg, concat_videos, pick_h264_encoder
+try:
+    from orjson import loads as json_loads  # Optional, and several times faster on large metadata files
+except ImportError:
+    json_loads = json.loads
 
 # --- Configuration ---
 RAW_VIDEO_FILE = "raw_recording.mp4"
 METADATA_FILE = "mouse_metadata.json"
 FINAL_VIDEO_FILE = "final_cut_ai.mp4"
 PREVIEW_WIDTH = 800
+PREVIEW_THROTTLE_MS = 30 # Minimum gap between preview redraws while scrubbing (~30 fps)
+RENDER_WORKERS = max(1, (os.cpu_count() or 2) // 2)  # Threads running crop+resize while rendering
+RENDER_PROCESSES = max(1, (os.cpu_count() or 2) // 2)  # Worker processes, each rendering its own segments
+RENDER_SEGMENT_SECONDS = 10  # Length of video each worker process renders at a time
+RENDER_QUEUE_SIZE = 32   # Frames in flight between the decoder, workers and encoder
+# Let ffmpeg's scale/crop filters apply the camera path instead of the Python frame loop.
+# It upsamples the whole frame before cropping, so at high zoom it touches more pixels.
+RENDER_WITH_FFMPEG_FILTERS = False
+DECODE_HWACCEL = None    # ffmpeg -hwaccel for rendering (e.g. "auto", "cuda", "d3d11va"), None for software
+RENDER_HW_ENCODE = True  # Encode renders with NVENC/QSV/AMF/VideoToolbox when one works here, else libx264
+RENDER_USE_OPENCL = True # Run the zoom resize on the GPU through OpenCL (cv2.UMat) when a device is available
+# cv2's OpenCL resize only has upscaling kernels for these; any other interpolation
+# would make the UMat path upload, resize on the CPU anyway, and download again
+OPENCL_INTERPOLATIONS = (cv2.INTER_NEAREST, cv2.INTER_LINEAR)
 
 # --- Zoom & Pan Parameters ---
 ZOOM_LEVEL = 2.0         # How much to zoom in (e.g., 2.0 = 200%)
 SMOOTHING = 0.08         # Camera smoothing factor (lower is smoother, 0.0-1.0)
 ZOOM_DURATION = 2.5      # How long the zoom effect lasts in seconds
+IDLE_ZOOM = 1.001        # Below this zoom, and within IDLE_OFFSET px of center, frames pass through as-is
+IDLE_OFFSET = 1.0
 
 # --- AI Parameters ---
 AI_CLICK_COOLDOWN = ZOOM_DURATION # Prevents frantic zooming on rapid clicks
 
+def load_metadata(metadata_file):
+    """Reads the recorder's mouse events, in any of its file layouts, as a list of event dicts."""
+    with open(metadata_file, 'r') as f:
+        text = f.read()
+    if not text.lstrip().startswith('['):
+        # Parse all the lines as one array: a single parser call instead of one per event
+        text = "[" + ",".join(line for line in text.splitlines() if line.strip()) + "]"
+    events = json_loads(text)
+    if events and isinstance(events[0], dict) and 'fields' in events[0]:
+        header, rows = events[0], events[1:]
+        fields, types = header['fields'], header['types']
+        type_index = fields.index('type')
+        events = [{**dict(zip(fields, row)), 'type': types[row[type_index]]} for row in rows]
+    return events
+
+def zoom_filter_graph(crops, width, height, fps):
+    """Expresses a per-frame crop path as an ffmpeg filter graph driven by sendcmd."""
+    crop_x, crop_y, crop_w, crop_h = crops.T
+    sx, sy = width / crop_w, height / crop_h
+    scaled_w = np.maximum(np.round(width * sx).astype(np.int64), width)
+    scaled_h = np.maximum(np.round(height * sy).astype(np.int64), height)
+    offset_x = np.clip(np.round(crop_x * sx).astype(np.int64), 0, scaled_w - width)
+    offset_y = np.clip(np.round(crop_y * sy).astype(np.int64), 0, scaled_h - height)
+
+    commands, last = [], None
+    for i, state in enumerate(zip(scaled_w, scaled_h, offset_x, offset_y)):
+        if state == last:
+            continue
+        last = state
+        # Half a frame early, so float rounding can never push a command onto the next frame
+        t = max(0.0, (i - 0.5) / fps)
+        commands.append(f"{t:.6f} scale w {state[0]}, scale h {state[1]}, "
+                        f"crop x {state[2]}, crop y {state[3]};")
+    return (f"[0:v]setpts=PTS-STARTPTS,sendcmd=c='{chr(10).join(commands)}',"
+            f"scale={width}:{height}:flags=lanczos,"
+            f"crop={width}:{height}:0:0:exact=1,format=yuv420p[out]")
+
 class Camera:
     """Represents the virtual camera that pans and zooms."""
+    # Fixed slots keep the per-frame update()/set_target() attribute traffic off the instance dict
+    __slots__ = ('screen_width', 'screen_height', 'x', 'y', 'zoom',
+                 'target_x', 'target_y', 'target_zoom')
+
+    # Zooming always upsamples the crop. Bicubic (4x4 taps) is visually on par with
+    # Lanczos4 (8x8 taps) at these factors for a quarter of the work; set this to
+    # cv2.INTER_LANCZOS4 for maximum-quality final renders.
+    interpolation = cv2.INTER_CUBIC
+
     def __init__(self, screen_width, screen_height):
         self.screen_width, self.screen_height = screen_width, screen_height
         self.x = self.target_x = screen_width / 2
@@ -45,12 +116,46 @@ class Camera:
         self.target_y = max(0, min(target_y, self.screen_height))
         self.target_zoom = max(1.0, target_zoom)
 
+    def trajectory(self, target_x, target_y, target_zoom):
+        """Runs update() for a whole sequence of targets at once, returning the x, y and zoom arrays."""
+        tx = np.clip(target_x, 0, self.screen_width)
+        ty = np.clip(target_y, 0, self.screen_height)
+        tz = np.maximum(target_zoom, 1.0)
+        b, a = [SMOOTHING], [1.0, SMOOTHING - 1.0]
+        xs = lfilter(b, a, tx, zi=[(1 - SMOOTHING) * self.x])[0]
+        ys = lfilter(b, a, ty, zi=[(1 - SMOOTHING) * self.y])[0]
+        zooms = lfilter(b, a, tz, zi=[(1 - SMOOTHING) * self.zoom])[0]
+        if len(xs):
+            self.x, self.y, self.zoom = xs[-1], ys[-1], zooms[-1]
+            self.target_x, self.target_y, self.target_zoom = tx[-1], ty[-1], tz[-1]
+        return xs, ys, zooms
+
+    def crop_windows(self, xs, ys, zooms):
+        """Computes the (x, y, w, h) crop rectangle for every camera state along a path as an (N, 4) array."""
+        w, h = self.screen_width, self.screen_height
+        crops = np.empty((len(zooms), 4), dtype=np.int32)
+        crop_x, crop_y, crop_w, crop_h = crops.T  # Column views; assigning into them fills crops
+        crop_w[:] = w / zooms
+        crop_h[:] = h / zooms
+        crop_x[:] = np.clip((xs - crop_w / 2).astype(np.int32), 0, w - crop_w)
+        crop_y[:] = np.clip((ys - crop_h / 2).astype(np.int32), 0, h - crop_h)
+
+        # Snap states that have all but settled on the full view to an exact
+        # full-frame crop, which crop_frame passes through without resampling
+        idle = (zooms < IDLE_ZOOM) & (np.abs(xs - w / 2) < IDLE_OFFSET) & (np.abs(ys - h / 2) < IDLE_OFFSET)
+        crops[idle] = (0, 0, w, h)
+        return crops
+
     def process_frame(self, frame):
         """Crops and resizes a frame based on the camera's state."""
         if frame is None:
             return None
             
         h, w = frame.shape[:2]
+        if (self.zoom < IDLE_ZOOM and abs(self.x - w / 2) < IDLE_OFFSET
+                and abs(self.y - h / 2) < IDLE_OFFSET):
+            return frame
+
         crop_w = int(w / self.zoom)
         crop_h = int(h / self.zoom)
         crop_x = int(self.x - crop_w / 2)
@@ -59,16 +164,116 @@ class Camera:
         # Ensure crop bounds are within frame
         crop_x = max(0, min(crop_x, w - crop_w))
         crop_y = max(0, min(crop_y, h - crop_h))
-        
+        return self.crop_frame(frame, crop_x, crop_y, crop_w, crop_h)
+
+    @classmethod
+    def crop_frame(cls, frame, crop_x, crop_y, crop_w, crop_h, interpolation=None, use_opencl=False):
+        """Cuts the crop rectangle out of a frame and scales it back up to full size."""
+        h, w = frame.shape[:2]
+        if crop_w >= w and crop_h >= h:
+            return frame  # Nothing to zoom into; skip the resample entirely
         try:
+            # A strided view resizes without being copied first. warpAffine can fuse the
+            # crop and scale into one call, but its general remap is ~10x slower than
+            # resize's separable kernels for the same pixels.
             cropped_frame = frame[crop_y:crop_y + crop_h, crop_x:crop_x + crop_w]
             if cropped_frame.size == 0:
                 return frame  # Return original if crop failed
-            return cv2.resize(cropped_frame, (w, h), interpolation=cv2.INTER_LANCZOS4)
+            if interpolation is None:
+                interpolation = cls.interpolation
+            if use_opencl:
+                return cv2.resize(cv2.UMat(cropped_frame), (w, h), interpolation=interpolation).get()
+            return cv2.resize(cropped_frame, (w, h), interpolation=interpolation)
         except Exception as e:
             print(f"Error processing frame: {e}")
             return frame
 
+def render_segment(video_file, width, height, fps, crops, output_file,
+                   start_frame=0, workers=1, interpolation=None,
+                   encoder=("libx264", ("-preset", "fast")), progress_callback=None):
+    """Renders the frames from start_frame on through their crop rectangles into output_file.
+
+    Also a worker-process entry point, so it only takes picklable arguments. Returns the frames written.
+    """
+    frame_count = len(crops)
+    rects = crops.tolist()  # Plain ints unpack faster per frame than numpy scalars
+    # Frames are decoded from and encoded into ffmpeg pipes, so memory use
+    # stays flat regardless of length and no per-frame work goes through MoviePy
+    reader = FFmpegReader(video_file, width, height,
+                          start_time=max(0.0, (start_frame - 0.5) / fps) if start_frame else 0,
+                          max_frames=frame_count, hwaccel=DECODE_HWACCEL)
+    writer = None
+    pending = queue.Queue(maxsize=RENDER_QUEUE_SIZE)
+    errors = []
+    written = 0
+
+    def encode_thread():
+        nonlocal written
+        while True:
+            future = pending.get()
+            if future is None:
+                break
+            if errors:
+                continue  # Keep draining so the decoder never blocks on a full queue
+            try:
+                writer.write(future.result())
+            except Exception as e:
+                errors.append(e)
+                continue
+            written += 1
+            if progress_callback and (written % 10 == 0 or written == frame_count):
+                progress_callback(written)
+
+    # One thread per worker already; stop cv2 from spawning its own on top
+    cv2.setNumThreads(1)
+    if interpolation is None:
+        interpolation = Camera.interpolation
+    # Checked once per segment: haveOpenCL() probes the drivers, and without a
+    # device the UMat round trip would only add copies
+    use_opencl = (RENDER_USE_OPENCL and interpolation in OPENCL_INTERPOLATIONS
+                  and cv2.ocl.haveOpenCL())
+    try:
+        writer = FFmpegWriter(output_file, width, height, fps,
+                              codec=encoder[0], codec_args=encoder[1])
+        encode_worker = threading.Thread(target=encode_thread, daemon=True)
+        encode_worker.start()
+        try:
+            # setUseOpenCL is per thread, so it has to be set in the threads doing the resizing
+            with ThreadPoolExecutor(max_workers=workers, initializer=cv2.ocl.setUseOpenCL,
+                                    initargs=(use_opencl,)) as pool:
+                frame, decoded = None, 0
+                for frame in reader:
+                    if errors:
+                        break
+                    pending.put(pool.submit(Camera.crop_frame, frame, *rects[decoded],
+                                            interpolation, use_opencl))
+                    decoded += 1
+                # ffmpeg ended cleanly but early: the container outlasts the video stream
+                # (a longer audio track, say), so hold the last frame as iter_frames did
+                if frame is not None and not errors:
+                    for i in range(decoded, frame_count):
+                        pending.put(pool.submit(Camera.crop_frame, frame, *rects[i],
+                                                interpolation, use_opencl))
+        finally:
+            pending.put(None)
+            encode_worker.join()
+        if errors:
+            raise errors[0]
+        if written != frame_count:
+            raise IOError(f"Only {written} of {frame_count} frames could be read from {video_file}")
+
+        # Let ffmpeg flush the remaining frames and finalize the file
+        writer.release()
+        return written
+    finally:
+        cv2.setNumThreads(-1)
+        reader.release()
+        if writer is not None:
+            try:
+                writer.release()
+            except Exception:
+                pass
+
 class EditorApp(tk.Tk):
     """The main GUI application for the editor."""
     def __init__(self, video_clip=None, metadata=None):
@@ -77,10 +282,15 @@ class EditorApp(tk.Tk):
         self.geometry("900x700")
         
         self.clip = video_clip
+        self.preview_clip = None
+        self._open_preview_clip()
         self.metadata = metadata or []
+        self._index_metadata()
         self.zoom_points = []
         self.current_frame_idx = 0
         self.is_rendering = False
+        self._pending_preview = None
+        self._last_preview_idx = -1  # Frame currently on the canvas; -1 forces the next redraw
         
         if self.clip:
             self.total_frames = int(self.clip.duration * self.clip.fps)
@@ -112,11 +322,18 @@ class EditorApp(tk.Tk):
         # Preview canvas
         self.canvas = tk.Canvas(main_frame, width=PREVIEW_WIDTH, height=self.preview_height, bg="black")
         self.canvas.pack(pady=5)
+        self.photo = tk.PhotoImage(width=PREVIEW_WIDTH, height=self.preview_height)
+        # One image item and a pool of marker lines are reused for every preview update
+        self._img_item = self.canvas.create_image(PREVIEW_WIDTH//2, self.preview_height//2,
+                                                  image=self.photo, tags="preview_image")
+        self._marker_items = []
         
         if not self.clip:
-            self.canvas.create_text(PREVIEW_WIDTH//2, self.preview_height//2, 
+            placeholder = self.canvas.create_text(PREVIEW_WIDTH//2, self.preview_height//2, 
                                   text="No video loaded\nUse File > Load Project Files", 
                                   fill="white", font=("Helvetica", 16))
+            # Kept under the (still blank) preview image so the first frame covers it
+            self.canvas.tag_lower(placeholder, self._img_item)
         
         # Timeline slider
         self.slider = ttk.Scale(main_frame, from_=0, to=max(1, self.total_frames - 1), 
@@ -200,10 +417,11 @@ class EditorApp(tk.Tk):
             # Create VideoFileClip with known parameters
             self.clip = VideoFileClip(video_file)
             self.clip.fps = fps
+            self._open_preview_clip()
             
             # Load metadata
-            with open(metadata_file, 'r') as f:
-                self.metadata = json.load(f)
+            self.metadata = load_metadata(metadata_file)
+            self._index_metadata()
             
             # Update UI
             self.total_frames = frame_count
@@ -224,6 +442,7 @@ class EditorApp(tk.Tk):
             self.update_zoom_info()
             
             # Update preview
+            self._last_preview_idx = -1
             self.update_preview(0)
             self.progress_label.config(text="Ready")
             
@@ -235,7 +454,13 @@ class EditorApp(tk.Tk):
     def on_slider_change(self, val):
         if self.clip and not self.is_rendering:
             self.current_frame_idx = int(float(val))
-            self.update_preview(self.current_frame_idx)
+            # Coalesce slider motion into at most one redraw per PREVIEW_THROTTLE_MS
+            if self._pending_preview is None:
+                self._pending_preview = self.after(PREVIEW_THROTTLE_MS, self._flush_preview)
+
+    def _flush_preview(self):
+        self._pending_preview = None
+        self.update_preview(self.current_frame_idx)
 
     def add_zoom_point(self):
         if not self.clip:
@@ -259,13 +484,13 @@ class EditorApp(tk.Tk):
             messagebox.showinfo("AI Analysis", "No metadata available for analysis.")
             return
             
-        suggested_points, last_zoom_time = [], -AI_CLICK_COOLDOWN
-        
-        for event in self.metadata:
-            if (event.get('type') == 'click_press' and 
-                event.get('time', 0) >= last_zoom_time + AI_CLICK_COOLDOWN):
-                suggested_points.append(event['time'])
-                last_zoom_time = event['time']
+        # Greedy cooldown over the sorted click times: after each accepted click,
+        # jump straight to the first click that is at least a cooldown later
+        clicks, suggested_points = self._click_times, []
+        i = np.searchsorted(clicks, 0.0)
+        while i < len(clicks):
+            suggested_points.append(float(clicks[i]))
+            i = np.searchsorted(clicks, clicks[i] + AI_CLICK_COOLDOWN)
         
         if not suggested_points:
             messagebox.showinfo("AI Analysis", "No significant click events found for zoom suggestions.")
@@ -294,42 +519,103 @@ class EditorApp(tk.Tk):
         if not self.clip:
             return
             
-        self.canvas.delete("zoom_marker")
-        for zoom_time in self.zoom_points:
+        # Move the existing lines into place and hide the spares instead of recreating them
+        for i, zoom_time in enumerate(self.zoom_points):
             x_pos = (zoom_time / self.clip.duration) * PREVIEW_WIDTH
-            self.canvas.create_line(x_pos, 0, x_pos, 15, fill="#FFD700", width=2, tags="zoom_marker")
+            if i < len(self._marker_items):
+                self.canvas.coords(self._marker_items[i], x_pos, 0, x_pos, 15)
+                self.canvas.itemconfig(self._marker_items[i], state=tk.NORMAL)
+            else:
+                self._marker_items.append(self.canvas.create_line(
+                    x_pos, 0, x_pos, 15, fill="#FFD700", width=2, tags="zoom_marker"))
+        for item in self._marker_items[len(self.zoom_points):]:
+            self.canvas.itemconfig(item, state=tk.HIDDEN)
 
     def update_preview(self, frame_idx):
         if not self.clip:
             return
+        # Slider events often land on the frame already shown; don't seek and decode it again
+        if frame_idx == self._last_preview_idx:
+            return
             
         try:
             current_time = frame_idx / self.clip.fps
             self.time_label.config(text=f"Time: {current_time:.2f}s / {self.clip.duration:.2f}s")
             
-            frame = self.clip.get_frame(current_time)
-            img = Image.fromarray(frame)
-            img.thumbnail((PREVIEW_WIDTH, self.preview_height), Image.Resampling.LANCZOS)
-            self.photo = ImageTk.PhotoImage(image=img)
-            
-            self.canvas.delete("preview_image")
-            self.canvas.create_image(PREVIEW_WIDTH//2, self.preview_height//2, 
-                                   image=self.photo, tags="preview_image")
+            frame = (self.preview_clip or self.clip).get_frame(current_time)
+            h, w = frame.shape[:2]
+            if w > PREVIEW_WIDTH or h > self.preview_height:
+                # INTER_AREA averages the source pixels: the right filter for shrinking,
+                # and cheap enough to keep scrubbing responsive
+                scale = min(PREVIEW_WIDTH / w, self.preview_height / h)
+                size = (max(1, round(w * scale)), max(1, round(h * scale)))
+                frame = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+
+            # Tk decodes binary PPM natively, so the frame goes into the same
+            # PhotoImage every time without a PIL image or ImageTk conversion
+            h, w = frame.shape[:2]
+            if (self.photo.width(), self.photo.height()) != (w, h):
+                self.photo.config(width=w, height=h)
+                self.canvas.coords(self._img_item, PREVIEW_WIDTH//2, self.preview_height//2)
+            ppm = b"P6\n%d %d\n255\n" % (w, h) + np.ascontiguousarray(frame, dtype=np.uint8).tobytes()
+            self.photo.put(ppm, to=(0, 0))
+            self.canvas.itemconfig(self._img_item, image=self.photo)
             self.draw_zoom_markers()
+            self._last_preview_idx = frame_idx
             
         except Exception as e:
             print(f"Error updating preview: {e}")
             self.time_label.config(text="Error loading frame")
 
+    def _open_preview_clip(self):
+        """Opens a second reader on the video that ffmpeg scales to the preview width as it decodes."""
+        if self.preview_clip is not None:
+            self.preview_clip.close()
+            self.preview_clip = None
+        if self.clip and self.clip.w > PREVIEW_WIDTH:
+            self.preview_clip = VideoFileClip(self.clip.filename, audio=False,
+                                              target_resolution=(None, PREVIEW_WIDTH),
+                                              resize_algorithm='area')
+
+    def _index_metadata(self):
+        """Builds sorted numpy arrays of the move and click events for fast time lookups."""
+        moves = [e for e in self.metadata if e.get('type') == 'move']
+        times = np.array([e.get('time', 0) for e in moves], dtype=np.float64)
+        order = np.argsort(times, kind='stable')
+        self._mt = times[order]
+        self._mx = np.array([e.get('x', 0) for e in moves], dtype=np.float64)[order]
+        self._my = np.array([e.get('y', 0) for e in moves], dtype=np.float64)[order]
+        self._click_times = np.sort(np.array(
+            [e.get('time', 0) for e in self.metadata if e.get('type') == 'click_press'], dtype=np.float64))
+
     def get_mouse_pos_at_time(self, t):
         """Get the mouse position at a specific time from metadata"""
-        if not self.metadata:
+        idx = np.searchsorted(self._mt, t, side='right') - 1
+        if idx < 0:
             return None
-            
-        for event in reversed(self.metadata):
-            if event.get('time', 0) <= t and event.get('type') == 'move':
-                return (event.get('x', 0), event.get('y', 0))
-        return None
+        return (self._mx[idx], self._my[idx])
+    
+    def _build_zoom_mask(self, total_frames):
+        """Marks every frame that falls inside a zoom period."""
+        frame_times = np.arange(total_frames) / self.clip.fps
+        in_zoom_mask = np.zeros(total_frames, dtype=bool)
+        for zt in self.zoom_points:
+            # Same comparisons as zt <= t < zt + ZOOM_DURATION on each frame time
+            start = np.searchsorted(frame_times, zt)
+            end = np.searchsorted(frame_times, zt + ZOOM_DURATION)
+            in_zoom_mask[start:end] = True
+        return in_zoom_mask
+
+    def _build_target_positions(self, total_frames):
+        """Resolves the mouse position for every frame with one vectorized lookup."""
+        frame_times = np.arange(total_frames) / self.clip.fps
+        idx = np.searchsorted(self._mt, frame_times, side='right') - 1
+        target_xy = np.empty((total_frames, 2), dtype=np.float64)
+        target_xy[:] = (self.clip.w / 2, self.clip.h / 2)  # Center until the first move event
+        has_pos = idx >= 0
+        target_xy[has_pos, 0] = self._mx[idx[has_pos]]
+        target_xy[has_pos, 1] = self._my[idx[has_pos]]
+        return target_xy
     
     def start_rendering(self):
         """Start the video rendering process"""
@@ -369,45 +655,28 @@ class EditorApp(tk.Tk):
         """Render the video with zoom effects"""
         try:
             camera = Camera(self.clip.w, self.clip.h)
-            processed_frames = []
-            total_frames = int(self.clip.duration * self.clip.fps)
+            # The container's duration covers the audio too, so go by the video stream's
+            # own frame count where the file has one
+            total_frames = self.total_frames
+            if total_frames <= 0:
+                total_frames = int(self.clip.duration * self.clip.fps)
             
             # Update progress bar maximum
             self.after(0, lambda: setattr(self.progress, 'maximum', total_frames))
 
-            for i, frame in enumerate(self.clip.iter_frames()):
-                current_time = i / self.clip.fps
-                
-                # Check if we're in a zoom period
-                in_zoom = any(zt <= current_time < zt + ZOOM_DURATION for zt in self.zoom_points)
-                
-                if in_zoom:
-                    # Find the mouse position at this time or use center
-                    target_pos = self.get_mouse_pos_at_time(current_time)
-                    if target_pos is None:
-                        target_pos = (self.clip.w / 2, self.clip.h / 2)
-                    camera.set_target(target_pos[0], target_pos[1], ZOOM_LEVEL)
-                else:
-                    # Return to center and normal zoom
-                    camera.set_target(self.clip.w / 2, self.clip.h / 2, 1.0)
-                
-                camera.update()
-                processed_frame = camera.process_frame(frame)
-                processed_frames.append(processed_frame)
-                
-                # Update progress every 10 frames
-                if i % 10 == 0:
-                    progress_val = i + 1
-                    self.after(0, lambda p=progress_val: setattr(self.progress, 'value', p))
-                    self.after(0, lambda p=progress_val: 
-                             self.progress_label.config(text=f"Rendering frame {p}/{total_frames}"))
+            # The whole camera path is known up front, so compute every crop rectangle at once
+            in_zoom_mask = self._build_zoom_mask(total_frames)
+            target_xy = self._build_target_positions(total_frames)
+            xs, ys, zooms = camera.trajectory(
+                np.where(in_zoom_mask, target_xy[:, 0], self.clip.w / 2),
+                np.where(in_zoom_mask, target_xy[:, 1], self.clip.h / 2),
+                np.where(in_zoom_mask, ZOOM_LEVEL, 1.0))
+            crops = camera.crop_windows(xs, ys, zooms)
 
-            # Save the video
-            self.after(0, lambda: self.progress_label.config(text="Saving video file... This may take a while."))
-            
-            final_clip = ImageSequenceClip(processed_frames, fps=self.clip.fps)
-            final_clip.write_videofile(output_file, codec="libx264", logger=None, verbose=False)
-            final_clip.close()
+            if RENDER_WITH_FFMPEG_FILTERS:
+                self._render_with_filters(output_file, crops, total_frames)
+            else:
+                self._render_frames(output_file, crops, total_frames)
 
             # Success
             self.after(0, lambda: messagebox.showinfo("Success!", 
@@ -421,6 +690,91 @@ class EditorApp(tk.Tk):
             # Reset UI state
             self.after(0, self._rendering_complete)
 
+    def _report_render_progress(self, frame_count, total_frames):
+        self.after(0, lambda: setattr(self.progress, 'value', frame_count))
+        self.after(0, lambda: 
+                 self.progress_label.config(text=f"Rendering frame {frame_count}/{total_frames}"))
+
+    def _render_encoder(self):
+        """The (codec, codec_args) used to encode the final video."""
+        if RENDER_HW_ENCODE:
+            return pick_h264_encoder()
+        return H264_ENCODERS[-1]
+
+    def _render_frames(self, output_file, crops, total_frames):
+        """Applies the crop path frame by frame, split across worker processes."""
+        fps = self.clip.fps
+        segment_frames = max(1, int(RENDER_SEGMENT_SECONDS * fps))
+        starts = list(range(0, total_frames, segment_frames))
+        # Chosen once here so every segment is encoded the same way and concatenates cleanly
+        encoder = self._render_encoder()
+
+        # A hardware encoder is one chip with a driver-limited number of sessions, so
+        # parallel segments would only contend for it (or fail to open a session)
+        if RENDER_PROCESSES <= 1 or len(starts) < 2 or encoder != H264_ENCODERS[-1]:
+            progress = lambda n: self._report_render_progress(n, total_frames)
+            try:
+                render_segment(self.clip.filename, self.clip.w, self.clip.h, fps,
+                               crops, output_file,
+                               workers=RENDER_WORKERS, interpolation=Camera.interpolation,
+                               encoder=encoder, progress_callback=progress)
+            except IOError as e:
+                if encoder == H264_ENCODERS[-1]:
+                    raise
+                print(f"Rendering with {encoder[0]} failed ({e}); rendering again with libx264")
+                render_segment(self.clip.filename, self.clip.w, self.clip.h, fps,
+                               crops, output_file,
+                               workers=RENDER_WORKERS, interpolation=Camera.interpolation,
+                               encoder=H264_ENCODERS[-1], progress_callback=progress)
+            return
+
+        workers = max(1, RENDER_WORKERS // RENDER_PROCESSES)
+        tmp_dir = tempfile.mkdtemp(prefix="zoomsi_render_")
+        try:
+            segment_files = [os.path.join(tmp_dir, f"segment_{k:04d}.mp4") for k in range(len(starts))]
+            with ProcessPoolExecutor(max_workers=RENDER_PROCESSES) as pool:
+                futures = []
+                for start, segment_file in zip(starts, segment_files):
+                    futures.append(pool.submit(
+                        render_segment, self.clip.filename, self.clip.w, self.clip.h, fps,
+                        crops[start:start + segment_frames], segment_file, start_frame=start, workers=workers,
+                        interpolation=Camera.interpolation, encoder=encoder))
+                done = 0
+                try:
+                    for future in as_completed(futures):
+                        done += future.result()
+                        self._report_render_progress(done, total_frames)
+                except Exception:
+                    for future in futures:
+                        future.cancel()
+                    raise
+
+            self.after(0, lambda: self.progress_label.config(text="Joining video segments..."))
+            concat_videos(segment_files, output_file)
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    def _render_with_filters(self, output_file, crops, total_frames):
+        """Applies the crop path inside a single ffmpeg transcode."""
+        graph = zoom_filter_graph(crops, self.clip.w, self.clip.h, self.clip.fps)
+        # The graph goes through a script file, which avoids command-line length and quoting limits
+        script = tempfile.NamedTemporaryFile('w', suffix='.txt', delete=False)
+        try:
+            with script:
+                script.write(graph)
+            codec, codec_args = self._render_encoder()
+            args = []
+            if DECODE_HWACCEL:
+                args += ["-hwaccel", DECODE_HWACCEL]
+            args += ["-i", self.clip.filename, "-filter_complex_script", script.name,
+                     "-map", "[out]", "-frames:v", str(total_frames),
+                     # Reconfiguring scale mid-stream drops the frame rate, so pin it on the output
+                     "-r", str(self.clip.fps),
+                     "-c:v", codec, *codec_args, "-pix_fmt", "yuv420p", output_file]
+            run_ffmpeg(args, lambda n: self._report_render_progress(n, total_frames))
+        finally:
+            os.remove(script.name)
+
     def _rendering_complete(self):
         """Called when rendering is complete"""
         self.is_rendering = False
@@ -450,11 +804,12 @@ def main():
             clip = VideoFileClip(RAW_VIDEO_FILE)
             clip.fps = fps
             
-            with open(METADATA_FILE, 'r') as f:
-                metadata = json.load(f)
+            metadata = load_metadata(METADATA_FILE)
             
             app.clip = clip
+            app._open_preview_clip()
             app.metadata = metadata
+            app._index_metadata()
             app.total_frames = frame_count
             app.preview_height = int(PREVIEW_WIDTH * (height / width))
             
@@ -465,6 +820,7 @@ def main():
             for btn in [app.ai_btn, app.add_zoom_btn, app.clear_btn, app.render_btn]:
                 btn.config(state=tk.NORMAL)
             
+            app._last_preview_idx = -1
             app.update_preview(0)
             app.progress_label.config(text="Ready")
             print("Default project files loaded successfully.")
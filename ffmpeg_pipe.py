@@ -0,0 +1,197 @@
+# ffmpeg_pipe.py
+
+import os
+import subprocess
+import tempfile
+from functools import lru_cache
+import numpy as np
+
+# H.264 encoders in order of preference, with the arguments each is run with.
+# The hardware ones are only used if a test encode on this machine succeeds.
+H264_ENCODERS = [
+    ("h264_nvenc", ("-preset", "p4", "-rc", "vbr", "-cq", "23")),
+    ("h264_qsv", ("-preset", "faster", "-global_quality", "23")),
+    ("h264_amf", ("-quality", "speed")),
+    ("h264_videotoolbox", ("-realtime", "1")),
+    ("libx264", ("-preset", "fast")),
+]
+PROBE_TIMEOUT = 5.0  # Seconds a test encode may take; a driver that hangs counts as a failure
+
+def get_ffmpeg_exe():
+    """Returns the ffmpeg binary, preferring the one bundled with imageio-ffmpeg."""
+    try:
+        import imageio_ffmpeg
+        return imageio_ffmpeg.get_ffmpeg_exe()
+    except Exception:
+        return "ffmpeg"
+
+def _popen_kwargs():
+    """Keeps ffmpeg from flashing a console window when launched from a GUI on Windows."""
+    if os.name == 'nt':
+        return {'creationflags': 0x08000000}  # CREATE_NO_WINDOW
+    return {}
+
+def _read_log(log):
+    """Returns what ffmpeg has written to its temporary log file so far."""
+    try:
+        log.seek(0)
+        return log.read().decode(errors='replace').strip()
+    except (OSError, ValueError):
+        return ""
+
+def run_ffmpeg(args, progress_callback=None):
+    """Runs ffmpeg to completion, reporting progress; raises IOError with ffmpeg's output if it fails."""
+    cmd = [get_ffmpeg_exe(), "-y", "-loglevel", "error", "-nostdin",
+           "-progress", "pipe:1", "-nostats", *args]
+    with tempfile.TemporaryFile() as log:
+        proc = subprocess.Popen(cmd, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+                                stderr=log, **_popen_kwargs())
+        for line in proc.stdout:
+            key, _, value = line.decode(errors='replace').strip().partition("=")
+            if key == "frame" and progress_callback and value.isdigit():
+                progress_callback(int(value))
+        returncode = proc.wait()
+        if returncode != 0:
+            message = _read_log(log)
+            raise IOError(f"ffmpeg exited with code {returncode}: {message}")
+
+def probe_encoder(codec, codec_args, width=256, height=256, fps=30, pix_fmt="rgb24"):
+    """Returns True if ffmpeg can encode a raw frame of this size and format with this codec and these arguments."""
+    # The frame goes in exactly as FFmpegWriter sends it; lavfi sources would quietly round odd sizes
+    cmd = [get_ffmpeg_exe(), "-loglevel", "error", "-nostdin",
+           "-f", "rawvideo", "-s", f"{width}x{height}", "-pix_fmt", pix_fmt, "-r", str(fps), "-i", "-",
+           "-c:v", codec, *codec_args, "-pix_fmt", "yuv420p", "-f", "null", "-"]
+    frame = bytes(width * height * (4 if pix_fmt in ("bgra", "rgba") else 3))
+    try:
+        return subprocess.run(cmd, input=frame, stdout=subprocess.DEVNULL,
+                              stderr=subprocess.DEVNULL, timeout=PROBE_TIMEOUT, **_popen_kwargs()).returncode == 0
+    except (OSError, subprocess.TimeoutExpired):
+        return False
+
+@lru_cache(maxsize=None)
+def pick_h264_encoder():
+    """Returns (codec, codec_args) for the first H.264 encoder that passes a test encode here."""
+    for codec, codec_args in H264_ENCODERS[:-1]:
+        if probe_encoder(codec, codec_args):
+            return codec, codec_args
+    return H264_ENCODERS[-1]
+
+def concat_videos(input_files, output_file):
+    """Joins videos that share encoding settings, copying their streams without re-encoding."""
+    with tempfile.NamedTemporaryFile('w', suffix='.txt', delete=False) as listing:
+        for path in input_files:
+            escaped = os.path.abspath(path).replace("\\", "/").replace("'", "'\\''")
+            listing.write(f"file '{escaped}'\n")
+    try:
+        run_ffmpeg(["-f", "concat", "-safe", "0", "-i", listing.name, "-c", "copy", output_file])
+    finally:
+        os.remove(listing.name)
+
+class FFmpegReader:
+    """Decodes a video into raw frames read from an ffmpeg pipe, like cv2.VideoCapture."""
+    def __init__(self, video_file, width, height, pix_fmt="rgb24", channels=3,
+                 start_time=0, max_frames=None, hwaccel=None):
+        self.shape = (height, width, channels)
+        cmd = [get_ffmpeg_exe(), "-loglevel", "error", "-nostdin"]
+        if hwaccel:
+            cmd += ["-hwaccel", hwaccel]
+        if start_time > 0:
+            # Input seeking decodes from the previous keyframe and drops frames before start_time
+            cmd += ["-ss", f"{start_time:.6f}"]
+        cmd += ["-i", video_file, "-an", "-f", "rawvideo", "-pix_fmt", pix_fmt,
+                "-s", f"{width}x{height}"]
+        if max_frames is not None:
+            cmd += ["-frames:v", str(max_frames)]
+        cmd.append("-")
+        self._log = tempfile.TemporaryFile()
+        try:
+            self._proc = subprocess.Popen(cmd, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+                                          stderr=self._log, **_popen_kwargs())
+        except OSError:
+            self._log.close()
+            raise
+
+    def isOpened(self):
+        return self._proc is not None
+
+    def read(self):
+        """Returns (True, frame), or (False, None) at the end; raises IOError if ffmpeg failed."""
+        if self._proc is None:
+            return False, None
+        frame = np.empty(self.shape, dtype=np.uint8)
+        n = self._proc.stdout.readinto(memoryview(frame).cast('B'))
+        if n != frame.nbytes:
+            self._close(stop=False)
+            return False, None
+        return True, frame
+
+    def __iter__(self):
+        while True:
+            ok, frame = self.read()
+            if not ok:
+                return
+            yield frame
+
+    def release(self):
+        """Stops the decoder; raises IOError if ffmpeg had already failed on its own."""
+        if self._proc is not None:
+            self._close(stop=True)
+
+    def _close(self, stop):
+        proc, self._proc = self._proc, None
+        proc.stdout.close()
+        stopped = stop and proc.poll() is None
+        if stopped:
+            proc.terminate()
+        returncode = proc.wait()
+        message = _read_log(self._log)
+        self._log.close()
+        if returncode != 0 and not stopped:
+            raise IOError(f"ffmpeg exited with code {returncode}: {message}")
+
+class FFmpegWriter:
+    """Encodes raw frames by piping them into ffmpeg, like cv2.VideoWriter."""
+    def __init__(self, output_file, width, height, fps, pix_fmt="rgb24",
+                 codec="libx264", codec_args=("-preset", "fast")):
+        self.output_file = output_file
+        cmd = [
+            get_ffmpeg_exe(), "-y", "-loglevel", "error",
+            "-f", "rawvideo", "-vcodec", "rawvideo",
+            "-s", f"{width}x{height}", "-pix_fmt", pix_fmt, "-r", str(fps),
+            "-i", "-",
+            "-c:v", codec, *codec_args, "-pix_fmt", "yuv420p",
+            output_file
+        ]
+        # ffmpeg's log goes to a temp file so a chatty encoder can never fill a pipe and stall us
+        self._log = tempfile.TemporaryFile()
+        try:
+            self._proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL,
+                                          stderr=self._log, **_popen_kwargs())
+        except OSError:
+            self._log.close()
+            raise
+
+    def isOpened(self):
+        return self._proc is not None and self._proc.poll() is None
+
+    def write(self, frame):
+        """Sends one frame, or a (n, h, w, c) stack of them, to the encoder without an intermediate bytes copy."""
+        try:
+            self._proc.stdin.write(np.ascontiguousarray(frame))
+        except (BrokenPipeError, OSError, AttributeError, ValueError) as e:
+            raise IOError(f"ffmpeg stopped accepting frames: {_read_log(self._log) or e}")
+
+    def release(self):
+        """Closes the pipe and waits for ffmpeg to finish writing the file."""
+        if self._proc is None:
+            return
+        proc, self._proc = self._proc, None
+        try:
+            proc.stdin.close()
+        except OSError:
+            pass
+        returncode = proc.wait()
+        message = _read_log(self._log)
+        self._log.close()
+        if returncode != 0:
+            raise IOError(f"ffmpeg exited with code {returncode}: {message}")
@@ -9,12 +9,13 @@ from recorder import ScreenRecorder
 
 OUTPUT_VIDEO_FILE = "raw_recording.mp4"
 OUTPUT_METADATA_FILE = "mouse_metadata.json"
+RECORD_REGION = None  # (left, top, right, bottom) to record only part of the screen; None for all of it
 
 class ControlPanel(tk.Tk):
     def __init__(self):
         super().__init__()
         
-        self.recorder = ScreenRecorder(OUTPUT_VIDEO_FILE, OUTPUT_METADATA_FILE)
+        self.recorder = ScreenRecorder(OUTPUT_VIDEO_FILE, OUTPUT_METADATA_FILE, region=RECORD_REGION)
         self.is_recording = False
         self.elapsed_time = 0
         self.timer_after_id = None
@@ -29,8 +30,9 @@ class ControlPanel(tk.Tk):
         self.lbl_status = tk.Label(self, text="Ready to record", font=("Helvetica", 10))
         self.lbl_status.pack(pady=(10, 0))
 
-        # Timer display
-        self.lbl_timer = tk.Label(self, text="00:00:00", font=("Helvetica", 24, "bold"))
+        # Timer display; driven through a StringVar so ticks only touch the text
+        self.timer_var = tk.StringVar(value="00:00:00")
+        self.lbl_timer = tk.Label(self, textvariable=self.timer_var, font=("Helvetica", 24, "bold"))
         self.lbl_timer.pack(pady=10)
 
         # Button frame
@@ -169,7 +171,7 @@ class ControlPanel(tk.Tk):
         
         hours, rem = divmod(self.elapsed_time, 3600)
         minutes, seconds = divmod(rem, 60)
-        self.lbl_timer.config(text=f"{int(hours):02}:{int(minutes):02}:{int(seconds):02}")
+        self.timer_var.set(f"{int(hours):02}:{int(minutes):02}:{int(seconds):02}")
         
         self.timer_after_id = self.after(1000, self.update_timer)
 
@@ -186,7 +188,7 @@ class ControlPanel(tk.Tk):
         self.btn_stop.config(state=tk.DISABLED)
         self.elapsed_time = 0
         self.recording_start_time = None
-        self.lbl_timer.config(text="00:00:00")
+        self.timer_var.set("00:00:00")
         
         # After 3 seconds, reset status to ready
         self.after(3000, lambda: self.lbl_status.config(text="Ready to record", fg="black"))
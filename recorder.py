@@ -2,284 +2,650 @@
 
 import cv2
 import dxcam
+import numpy as np
 import json
+import os
 import time
 import threading
+import multiprocessing
+import queue
+import inspect
+from functools import lru_cache, partial
 from pynput import mouse
+from ffmpeg_pipe import FFmpegWriter, H264_ENCODERS, pick_h264_encoder, probe_encoder, run_ffmpeg
+
+# Low-latency settings per encoder for live capture, where keeping up matters more than file size
+CAPTURE_ENCODER_ARGS = {
+    "h264_nvenc": ("-preset", "p1", "-tune", "ull"),
+    "h264_qsv": ("-preset", "veryfast", "-low_power", "1"),
+    "h264_amf": ("-usage", "ultralowlatency", "-quality", "speed"),
+    "h264_videotoolbox": ("-realtime", "1"),
+    "libx264": ("-preset", "ultrafast", "-tune", "zerolatency"),
+    "utvideo": (),
+}
+# Without a hardware encoder, capture losslessly with the much cheaper utvideo and encode
+# to H.264 once recording stops. Costs disk space (roughly 1 GB a minute at 1080p30)
+# and a wait on stop, so it is off by default
+CAPTURE_LOSSLESS_INTERMEDIATE = False
+CAPTURE_START_TIMEOUT = 15.0  # Seconds to wait for the capture process to open the camera and encoder
+CAPTURE_STOP_TIMEOUT = 10.0   # Seconds the capture process gets to finish writing the video on stop
+CAPTURE_RING_FRAMES = 8       # Frame slots between capture and the encoder; capture blocks when all are full
+CAPTURE_WRITE_BATCH = 4       # Most waiting frames sent to an ffmpeg pipe in a single write
+MOUSE_FLUSH_EVENTS = 256      # Mouse events buffered before they are appended to the metadata file
+RUNNING, PAUSED, STOPPED = 0, 1, 2  # Recording states shared with the capture process
+EVENT_TYPES = ('move', 'click_press', 'click_release')  # Stored by index in the event buffers
+EVENT_FIELDS = ('time', 'type', 'x', 'y', 'button')     # Columns of each metadata row
+
+def _probe_capture_encoder(codec, width, height, fps):
+    """Test-encodes one BGR frame of this size with codec's capture settings."""
+    if probe_encoder(codec, CAPTURE_ENCODER_ARGS[codec], width, height, fps, pix_fmt="bgr24"):
+        return True
+    print(f"ffmpeg cannot encode {width}x{height} with {codec}")
+    return False
+
+@lru_cache(maxsize=None)
+def pick_capture_encoder(width, height, fps, lossless=False):
+    """Returns the ffmpeg codec to capture with at this size, or None to rely on OpenCV's encoders."""
+    # ffmpeg only opens the encoder once the first frame arrives, so a writer that
+    # fails would still look open; each candidate gets a test frame instead
+    candidates = ["utvideo"] if lossless else []
+    if pick_h264_encoder()[0] != "libx264":
+        candidates += [codec for codec, _ in H264_ENCODERS[:-1]]
+    candidates.append("libx264")
+    for codec in candidates:
+        if _probe_capture_encoder(codec, width, height, fps):
+            return codec
+    return None
+
+def _open_ffmpeg_writer(video_file, fps, width, height, codec):
+    """Opens a raw BGR pipe into ffmpeg running the given encoder, or returns None."""
+    try:
+        writer = FFmpegWriter(video_file, width, height, fps, pix_fmt="bgr24",
+                              codec=codec, codec_args=CAPTURE_ENCODER_ARGS[codec])
+        if writer.isOpened():
+            print(f"Encoding with ffmpeg ({codec})")
+            return writer
+    except OSError as e:
+        print(f"ffmpeg encoding unavailable: {e}")
+    return None
+
+def open_video_writer(video_file, fps, width, height, codec=None):
+    """Opens the fastest working writer for BGR frames of the given size, given pick_capture_encoder's codec."""
+    if codec not in (None, "libx264"):
+        writer = _open_ffmpeg_writer(video_file, fps, width, height, codec)
+        if writer is not None:
+            return writer
+
+    try:
+        writer = cv2.VideoWriter(video_file, cv2.CAP_FFMPEG, cv2.VideoWriter_fourcc(*'avc1'),
+                                 fps, (width, height),
+                                 [cv2.VIDEOWRITER_PROP_HW_ACCELERATION, cv2.VIDEO_ACCELERATION_ANY])
+        # VIDEO_ACCELERATION_ANY quietly falls back to software; only keep it if the GPU took it
+        if writer.isOpened() and writer.get(cv2.VIDEOWRITER_PROP_HW_ACCELERATION) != cv2.VIDEO_ACCELERATION_NONE:
+            print("Encoding with OpenCV hardware acceleration")
+            return writer
+        writer.release()
+    except (cv2.error, AttributeError) as e:
+        print(f"OpenCV hardware encoding unavailable: {e}")
+
+    if codec is not None:
+        writer = _open_ffmpeg_writer(video_file, fps, width, height, "libx264")
+        if writer is not None:
+            return writer
+
+    fourcc = cv2.VideoWriter_fourcc(*'mp4v')
+    return cv2.VideoWriter(video_file, fourcc, fps, (width, height))
+
+def _raise_capture_priority():
+    """Raises the capture process's priority and the timer resolution on Windows; True if timeEndPeriod(1) is owed."""
+    if os.name != 'nt':
+        return False
+    try:
+        import ctypes
+        kernel32 = ctypes.windll.kernel32
+        # The high class lifts this process's other threads, dxcam's DXGI thread and the
+        # ring writer, above normal apps. Time-critical is already base priority 15 in
+        # any non-realtime class, so it only matters for this thread, which just waits
+        # in get_latest_frame
+        kernel32.SetPriorityClass(kernel32.GetCurrentProcess(), 0x80)  # HIGH_PRIORITY_CLASS
+        kernel32.SetThreadPriority(kernel32.GetCurrentThread(), 15)  # THREAD_PRIORITY_TIME_CRITICAL
+        return ctypes.windll.winmm.timeBeginPeriod(1) == 0  # TIMERR_NOERROR
+    except (AttributeError, OSError) as e:
+        print(f"Could not raise capture priority: {e}")
+        return False
+
+def capture_worker(video_file, fps, width, height, state, state_changed, pauses, status_queue,
+                   codec=None, region=None):
+    """Capture process entry point: grabs frames into a ring that a writer thread encodes.
+
+    Puts ("ready"|"error", message) on status_queue after setup and ("done"|"error", message) on exit.
+    """
+    camera = video_writer = writer = None
+    timer_raised = False
+    ring = None
+    free_slots = threading.Semaphore(CAPTURE_RING_FRAMES)
+    filled_slots = threading.Semaphore(0)
+    finished = threading.Event()  # Set once no more frames will be captured
+    errors = []
+    failure = None  # Why recording ended early, reported to the parent on exit
+    captured = 0
+    repeated = 0  # Frames written twice to stand in for ones lost while capture was held up
+
+    def write_frames():
+        written = 0
+        wait_filled, free_slot, write = filled_slots.acquire, free_slots.release, video_writer.write
+        n_slots = CAPTURE_RING_FRAMES
+        # A raw pipe takes several frames in one write; cv2.VideoWriter wants them one by one
+        batch = CAPTURE_WRITE_BATCH if isinstance(video_writer, FFmpegWriter) else 1
+        while True:
+            wait_filled()
+            # Pick up frames that are already waiting, as long as they sit next to each
+            # other in the ring; this never waits for more, so it adds no latency
+            start, n = written % n_slots, 1
+            while n < batch and start + n < n_slots and wait_filled(False):
+                n += 1
+            done = finished.is_set()
+            if done and written + n > captured:
+                n -= 1  # The last count taken was the end-of-capture marker
+            if n and not errors:
+                try:
+                    write(ring[start:start + n] if n > 1 else ring[start])
+                except Exception as e:
+                    errors.append(e)  # Keep freeing slots so capture never blocks on a dead writer
+            written += n
+            if n:
+                free_slot(n)
+            if done and written == captured:
+                return
+
+    def repeat_last_frame(until):
+        # get_latest_frame only returns the newest frame, so any that dxcam produced
+        # while the loop was held up (usually waiting on a full ring) are lost.
+        # Copies of the last frame take their place, keeping the video at a constant
+        # fps and in step with the mouse timestamps
+        nonlocal captured, repeated
+        missing = until - captured
+        if missing <= 0 or not captured:
+            return
+        repeated += missing
+        last = ring[(captured - 1) % CAPTURE_RING_FRAMES]
+        for _ in range(missing):
+            free_slots.acquire()
+            np.copyto(ring[captured % CAPTURE_RING_FRAMES], last)
+            captured += 1
+            filled_slots.release()
+
+    try:
+        try:
+            # BGRA is what DXGI produces. Asking dxcam for BGR would only make it run
+            # cvtColor into a fresh array; converting into the ring slot below does the
+            # same work without that allocation
+            camera = dxcam.create(output_color="BGRA", region=region)
+            if not camera:
+                raise Exception("Failed to create DXCam instance")
+            if region is None and (camera.width, camera.height) != (width, height):
+                # The ring and encoder must match what the camera really delivers
+                print(f"Screen is {camera.width}x{camera.height}, not {width}x{height}; using the camera's size")
+                width, height = camera.width, camera.height
+                # codec was only tested at the size asked for
+                if codec is not None and not _probe_capture_encoder(codec, width, height, fps):
+                    codec = "libx264" if _probe_capture_encoder("libx264", width, height, fps) else None
+            ring = np.empty((CAPTURE_RING_FRAMES, height, width, 3), dtype=np.uint8)
+            video_writer = open_video_writer(video_file, fps, width, height, codec)
+            if not video_writer.isOpened():
+                raise IOError("Could not open video writer. Check permissions or codecs.")
+            # Video mode paces capture itself: dxcam waits on DXGI for new frames and
+            # repeats the last one when the screen is idle, so exactly fps frames a second
+            # come out of get_latest_frame
+            camera.start(target_fps=fps, video_mode=True)
+        except Exception as e:
+            status_queue.put(("error", str(e)))
+            status_queue = None  # Already told the parent; nothing more to report
+            return
+        status_queue.put(("ready", None))
+
+        writer = threading.Thread(target=write_frames, daemon=True)
+        writer.start()
+        # Keeps other apps (and our own Tk/mouse threads) from delaying frame pickup under load
+        timer_raised = _raise_capture_priority()
+        print("Screen recording process started")
+
+        # Everything the loop touches is bound to a local once, so each frame costs
+        # no attribute or global lookups on top of the calls themselves
+        grab, convert, bgra2bgr = camera.get_latest_frame, cv2.cvtColor, cv2.COLOR_BGRA2BGR
+        # get_latest_frame copies each frame into a new array unless told not to (dxcam
+        # 0.3+); the view it returns otherwise is converted before dxcam can reuse it
+        if "copy" in inspect.signature(grab).parameters:
+            grab = partial(grab, copy=False)
+        acquire_slot, fill_slot = free_slots.acquire, filled_slots.release
+        slots, n_slots = list(ring), CAPTURE_RING_FRAMES
+        clock = time.perf_counter_ns
+        start = None  # When the first frame arrived
+
+        def frames_due(now):
+            # Frames the video should hold by now; paused time is not part of it. While
+            # paused or stopping, the clock stands at the moment that happened, however
+            # late this loop notices (perf_counter_ns is system-wide on Windows and Linux)
+            if state.value != RUNNING:
+                now = pauses[0]
+            return int((now - start - pauses[1]) * fps // 1_000_000_000)
+
+        while not errors:
+            if state.value != RUNNING:
+                if start is not None:
+                    repeat_last_frame(frames_due(clock()) + 1)
+                # Sleeps until resumed or stopped; nothing wakes up periodically while paused
+                with state_changed:
+                    state_changed.wait_for(lambda: state.value != PAUSED)
+                if state.value == STOPPED:
+                    break
+
+            try:
+                frame = grab()
+                if frame is None:
+                    continue
+                now = clock()
+                if start is None:
+                    start = now
+                else:
+                    repeat_last_frame(frames_due(now))
+                acquire_slot()
+                # OpenCV's BGRA2BGR is already a vectorized shuffle running at memcpy speed
+                convert(frame, bgra2bgr, dst=slots[captured % n_slots])
+                captured += 1
+                fill_slot()
+            except Exception as e:
+                failure = f"Frame capture error: {e}"
+                print(failure)
+                break
+
+        if errors:
+            failure = f"Frame write error: {errors[0]}"
+            print(failure)
+        if repeated:
+            print(f"Capture fell behind: {repeated} of {captured} frames repeat the one before to stand in "
+                  f"for lost frames; consider a hardware encoder")
+
+    except Exception as e:
+        failure = f"Screen recording process error: {e}"
+        print(failure)
+    finally:
+        if writer is not None:
+            # Let the frames still in the ring reach the encoder before the file is finalized
+            finished.set()
+            filled_slots.release()
+            writer.join()
+        if video_writer is not None:
+            try:
+                print("Flushing video writer...")
+                video_writer.release()
+            except Exception as e:
+                failure = failure or f"Error flushing video writer: {e}"
+                print(f"Error flushing video writer: {e}")
+        if camera:
+            try:
+                camera.stop()
+            except Exception as e:
+                print(f"Error stopping camera: {e}")
+        if timer_raised:
+            import ctypes
+            ctypes.windll.winmm.timeEndPeriod(1)
+        if status_queue is not None:
+            status_queue.put(("error", failure) if failure else ("done", None))
+        print("Screen recording process finished")
 
 class ScreenRecorder:
-    """A robust, thread-safe screen recorder."""
-    def __init__(self, video_file, metadata_file, fps=30):
+    """A robust screen recorder: frames are captured and encoded in a separate process."""
+    def __init__(self, video_file, metadata_file, fps=30, region=None):
         self.video_file = video_file
         self.metadata_file = metadata_file
         self.fps = fps
-        
+        # Optional (left, top, right, bottom) part of the screen to record. Fewer pixels
+        # means proportionally less capture, conversion and encoding work; mouse
+        # positions are then stored relative to its top-left corner
+        self.region = region
+        self._region = None  # The region actually recorded, once start() has checked it
+
         # State
         self.is_recording = False
         self.is_paused = False
-        self.start_time = 0
+        self.start_time_ns = 0  # perf_counter_ns() at the start, moved forward by any pauses
 
-        # Threading control
-        self._stop_event = threading.Event()
-        self._pause_event = threading.Event()
-        self._pause_event.set() # Set means not paused
-        self._write_lock = threading.Lock()  # Protect video writer access
+        # Control shared with the capture process: a plain shared int the loop can read
+        # for free every frame, plus a condition to sleep on while paused
+        self._state = multiprocessing.RawValue('i', STOPPED)
+        self._state_changed = multiprocessing.Condition()
+        # perf_counter_ns() when the clock last stopped (pause or stop) and the total ns
+        # paused, so capture can tell how many frames the video should hold at any moment.
+        # The event times are shifted by the same values, so they stay in step with it
+        self._pauses = multiprocessing.RawArray('q', 2)
 
         # Resources
-        self.camera = None
-        self.video_writer = None
+        self.capture_file = video_file  # Where the capture process writes; see CAPTURE_LOSSLESS_INTERMEDIATE
+        self.capture_process = None
+        self._status_queue = None     # Messages from the capture process
         self.mouse_listener = None
-        self.mouse_events = []
-        self._threads = []
+        self._metadata_fp = None
+        self._metadata_queue = None   # Full event buffers waiting for the metadata writer thread
+        self._metadata_writer = None
+        self._reset_mouse_events()
 
     def _get_screen_resolution(self):
-        """Gets screen resolution using dxcam correctly."""
+        """Gets the primary screen's resolution in physical pixels straight from Win32."""
         try:
-            # Create temporary camera instance to get resolution
-            temp_cam = dxcam.create()
-            if temp_cam:
-                width, height = temp_cam.width, temp_cam.height
-                del temp_cam
+            import ctypes
+            user32 = ctypes.windll.user32
+            # Without DPI awareness Windows reports scaled sizes (and mouse positions)
+            user32.SetProcessDPIAware()
+            width, height = user32.GetSystemMetrics(0), user32.GetSystemMetrics(1)  # SM_CXSCREEN, SM_CYSCREEN
+            if width and height:
                 return (width, height)
         except Exception as e:
-            print(f"DXCam resolution check failed: {e}. Falling back to 1920x1080.")
+            print(f"Screen resolution check failed: {e}. Falling back to 1920x1080.")
         return (1920, 1080)
 
-    def _record_screen_thread(self):
-        """Thread target for capturing the screen with DXCam."""
-        frame_time = 1.0 / self.fps
-        print("Screen recording thread started")
-        
-        try:
-            while not self._stop_event.is_set():
-                # Check if we should pause - but with shorter timeout
-                if not self._pause_event.is_set():
-                    # We're paused, check stop event more frequently
-                    if self._stop_event.wait(timeout=0.1):
-                        break
-                    continue
-                
-                start = time.time()
-                
-                try:
-                    frame = self.camera.get_latest_frame()
-                    if frame is not None:
-                        with self._write_lock:
-                            if self.video_writer and self.video_writer.isOpened():
-                                bgr_frame = cv2.cvtColor(frame, cv2.COLOR_BGRA2BGR)
-                                self.video_writer.write(bgr_frame)
-                except Exception as e:
-                    print(f"Frame capture error: {e}")
-                    break
-                
-                # Maintain frame rate with responsive stop checking
-                elapsed = time.time() - start
-                sleep_time = frame_time - elapsed
-                if sleep_time > 0:
-                    # Break sleep into smaller chunks to be more responsive
-                    chunks = max(1, int(sleep_time / 0.01))  # 10ms chunks
-                    chunk_time = sleep_time / chunks
-                    for _ in range(chunks):
-                        if self._stop_event.is_set():
-                            break
-                        time.sleep(chunk_time)
-                        
-        except Exception as e:
-            print(f"Screen recording thread error: {e}")
-        finally:
-            # Ensure video writer is flushed from this thread
-            with self._write_lock:
-                if self.video_writer and self.video_writer.isOpened():
-                    try:
-                        print("Flushing video writer...")
-                        self.video_writer.release()
-                    except Exception as e:
-                        print(f"Error flushing video writer: {e}")
-                    finally:
-                        self.video_writer = None
-            print("Screen recording thread finished")
-
-    def _mouse_listener_thread(self):
-        """Thread target for capturing mouse events with pynput."""
-        print("Mouse listener thread started")
-        
-        def on_event(event_type, x, y, button=None, pressed=None):
-            if self.is_recording and not self.is_paused and not self._stop_event.is_set():
-                elapsed = time.time() - self.start_time
-                self.mouse_events.append({
-                    'time': elapsed, 'type': event_type, 
-                    'x': int(x), 'y': int(y), 
-                    'button': str(button) if button else None
-                })
-
-        def on_move(x, y): 
-            on_event('move', x, y)
-            
-        def on_click(x, y, button, pressed): 
-            on_event('click_press' if pressed else 'click_release', x, y, button)
-        
+    def _clip_region(self, screen_width, screen_height):
+        """Clamps the requested region to the screen, with an even size as yuv420p needs; None for the whole screen."""
+        if not self.region:
+            return None
+        left, top, right, bottom = self.region
+        left, top = max(0, left), max(0, top)
+        right, bottom = min(screen_width, right), min(screen_height, bottom)
+        width, height = (right - left) // 2 * 2, (bottom - top) // 2 * 2
+        if width <= 0 or height <= 0:
+            raise ValueError(f"Recording region {self.region} is outside the {screen_width}x{screen_height} screen")
+        region = (left, top, left + width, top + height)
+        if region != tuple(self.region):
+            print(f"Recording region {tuple(self.region)} adjusted to {region}")
+        return region
+
+    def _reset_mouse_events(self):
+        """Starts a fresh set of event buffers and button codes for a new recording."""
+        self._new_event_buffers()
+        self._button_json = ['null']  # Buttons as JSON values, by code; 0 means no button
+        self._button_codes = {}
+        self._origin_x, self._origin_y = self._region[:2] if self._region else (0, 0)
+
+    def _new_event_buffers(self):
+        """Allocates empty mouse event buffers, one numpy column per field."""
+        self._ev_time = np.empty(MOUSE_FLUSH_EVENTS, dtype=np.int64)  # ns since start
+        self._ev_type = np.empty(MOUSE_FLUSH_EVENTS, dtype=np.uint8)
+        self._ev_x = np.empty(MOUSE_FLUSH_EVENTS, dtype=np.int32)
+        self._ev_y = np.empty(MOUSE_FLUSH_EVENTS, dtype=np.int32)
+        self._ev_button = np.empty(MOUSE_FLUSH_EVENTS, dtype=np.uint8)
+        self._n_events = 0
+        self._move_frame = -1  # Video frame of the last buffered event if it is a move, else -1
+
+    def _flush_mouse_events(self):
+        """Hands the buffered events to the metadata writer thread and starts new buffers."""
+        n = self._n_events
+        if n and self._metadata_queue is not None:
+            self._metadata_queue.put((self._ev_time, self._ev_type, self._ev_x, self._ev_y, self._ev_button, n))
+            self._new_event_buffers()
+
+    def _open_metadata_file(self):
+        """Opens the metadata file, writes its header, and starts the thread that appends events to it."""
+        self._metadata_fp = open(self.metadata_file, 'w', buffering=1 << 20)
+        # Rows carry no key names, so the first line says what their columns are
+        self._metadata_fp.write(json.dumps({"fields": EVENT_FIELDS, "types": EVENT_TYPES}) + "\n")
+        self._metadata_queue = queue.SimpleQueue()
+        self._metadata_writer = threading.Thread(
+            target=self._write_metadata, args=(self._metadata_fp, self._metadata_queue, self._button_json),
+            daemon=True)
+        self._metadata_writer.start()
+
+    def _write_metadata(self, fp, events, buttons):
+        """Metadata writer thread: appends each handed-off buffer to fp as JSON rows until it gets None."""
+        failed = False
+        while True:
+            batch = events.get()
+            if batch is None:
+                return
+            if failed:
+                continue  # Keep draining so stop() can still join
+            ev_time, ev_type, ev_x, ev_y, ev_button, n = batch
+            try:
+                fp.write("".join(
+                    f'[{t:.4f},{k},{x},{y},{buttons[b]}]\n'
+                    for t, k, x, y, b in zip((ev_time[:n] / 1e9).tolist(), ev_type[:n].tolist(),
+                                             ev_x[:n].tolist(), ev_y[:n].tolist(), ev_button[:n].tolist())))
+            except (OSError, ValueError) as e:
+                print(f"Error writing metadata: {e}")
+                failed = True
+
+    def _close_metadata_file(self):
+        """Waits for the writer thread to append everything handed to it, then closes the file."""
+        if self._metadata_writer is not None:
+            self._metadata_queue.put(None)
+            self._metadata_writer.join()
+            self._metadata_writer = self._metadata_queue = None
+        if self._metadata_fp:
+            self._metadata_fp.close()
+            self._metadata_fp = None
+
+    def _record_mouse_event(self, event_type, x, y, button=None, _now=time.perf_counter_ns):
+        """Buffers one mouse event, timed from the start of the recording."""
+        elapsed = _now() - self.start_time_ns  # Integer ns: exact however long the recording
+        i = self._n_events
+        if event_type == 0:
+            # A fast mouse reports many moves per video frame, but the editor only places
+            # the cursor once a frame; a move in the same frame as the one just buffered
+            # replaces it. Clicks are always kept, and a move after one starts afresh
+            frame = elapsed * self.fps // 1_000_000_000
+            if frame == self._move_frame:
+                i -= 1
+            self._move_frame = frame
+        else:
+            self._move_frame = -1
+        self._ev_time[i] = elapsed
+        self._ev_type[i] = event_type
+        self._ev_x[i] = x - self._origin_x
+        self._ev_y[i] = y - self._origin_y
+        code = 0
+        if button:
+            code = self._button_codes.get(button)
+            if code is None:
+                code = self._button_codes[button] = len(self._button_json)
+                self._button_json.append(json.dumps(str(button)))
+        self._ev_button[i] = code
+        self._n_events = i + 1
+        if self._n_events == MOUSE_FLUSH_EVENTS:
+            self._flush_mouse_events()
+
+    def _start_mouse_listener(self):
+        """Starts a pynput listener; a stopped one cannot be restarted, so each run gets a new one."""
+        record = self._record_mouse_event  # Bound once, not looked up on self per event
+
+        def on_move(x, y):
+            record(0, x, y)
+
+        def on_click(x, y, button, pressed):
+            record(1 if pressed else 2, x, y, button)
+
+        self.mouse_listener = mouse.Listener(on_move=on_move, on_click=on_click)
+        self.mouse_listener.start()
+
+    def _stop_mouse_listener(self):
+        """Stops the listener and waits for its last callback, so the event buffers are left alone."""
+        listener, self.mouse_listener = self.mouse_listener, None
+        if listener is None:
+            return
         try:
-            with mouse.Listener(on_move=on_move, on_click=on_click) as listener:
-                self.mouse_listener = listener
-                # Keep listener running until stop is requested
-                while not self._stop_event.is_set():
-                    if not listener.running:
-                        break
-                    time.sleep(0.1)
+            listener.stop()
+            listener.join(timeout=3.0)
         except Exception as e:
             print(f"Mouse listener error: {e}")
-        finally:
-            print("Mouse listener thread finished")
 
     def start(self):
-        """Initializes resources and starts all recording threads."""
-        if self.is_recording: 
+        """Starts the capture process, then the mouse listener once capture is running."""
+        if self.is_recording:
             print("Already recording")
             return False
-            
+
         try:
             print("Initializing recording...")
+            # Always asked for, since it also makes the process DPI aware
             width, height = self._get_screen_resolution()
-            
-            # Initialize camera
-            self.camera = dxcam.create(output_color="BGRA")
-            if not self.camera:
-                raise Exception("Failed to create DXCam instance")
-            
-            # Initialize video writer
-            fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-            self.video_writer = cv2.VideoWriter(self.video_file, fourcc, self.fps, (width, height))
+            self._region = self._clip_region(width, height)
+            if self._region:
+                left, top, right, bottom = self._region
+                width, height = right - left, bottom - top
 
-            if not self.video_writer.isOpened():
-                raise IOError("Could not open video writer. Check permissions or codecs.")
+            self._pauses[0] = self._pauses[1] = 0
+            self._set_state(RUNNING)
+
+            self.capture_file = self.video_file
+            if CAPTURE_LOSSLESS_INTERMEDIATE and pick_h264_encoder()[0] == "libx264":
+                self.capture_file = os.path.splitext(self.video_file)[0] + ".capture.mkv"
+            # Probed here rather than in the capture process, which is new every recording
+            codec = pick_capture_encoder(width, height, self.fps, self.capture_file != self.video_file)
+
+            # The camera and encoder are created inside the capture process, which
+            # reports back once both are open
+            status_queue = self._status_queue = multiprocessing.Queue()
+            self.capture_process = multiprocessing.Process(
+                target=capture_worker,
+                args=(self.capture_file, self.fps, width, height,
+                      self._state, self._state_changed, self._pauses, status_queue,
+                      codec, self._region),
+                daemon=True)
+            self.capture_process.start()
+            try:
+                status, message = status_queue.get(timeout=CAPTURE_START_TIMEOUT)
+            except queue.Empty:
+                raise Exception("Capture process did not start in time")
+            if status != "ready":
+                self._status_queue = None  # The process reports nothing after a failed start
+                raise Exception(message)
 
             # Reset state
             self.is_recording = True
             self.is_paused = False
-            self.start_time = time.time()
-            self.mouse_events = []
-            self._stop_event.clear()
-            self._pause_event.set()
-
-            # Start threads
-            self._threads = [
-                threading.Thread(target=self._record_screen_thread, daemon=False),
-                threading.Thread(target=self._mouse_listener_thread, daemon=False)
-            ]
-            
-            for t in self._threads:
-                t.start()
-            
+            self._reset_mouse_events()
+            # Events are streamed to the metadata file while recording, so stopping
+            # never has to serialize the whole session at once
+            self._open_metadata_file()
+            self.start_time_ns = time.perf_counter_ns()  # Monotonic, unlike the wall clock
+            self._start_mouse_listener()
+
             print("Recording started successfully.")
             return True
-            
+
         except Exception as e:
             print(f"ERROR starting recording: {e}")
+            self._stop_mouse_listener()
             self._cleanup_resources()
             self.is_recording = False
             return False
 
     def stop(self):
-        """Signals all threads to stop, waits for them, and cleans up resources."""
-        if not self.is_recording: 
+        """Signals the capture process and threads to stop, waits for them, and saves the metadata."""
+        if not self.is_recording:
             print("Not currently recording")
             return False
-        
+
         print("Stopping recording...")
-        
-        # Signal all threads to stop
-        self._stop_event.set()
-        
-        # If paused, resume to let threads exit cleanly
-        if self.is_paused:
-            self._pause_event.set()
-            self.is_paused = False
-        
-        # Stop mouse listener explicitly
-        if self.mouse_listener:
-            try:
-                self.mouse_listener.stop()
-            except:
-                pass
-        
-        # Wait for threads to finish with timeout
-        print("Waiting for threads to finish...")
-        for i, t in enumerate(self._threads):
-            print(f"Waiting for thread {i+1}...")
-            t.join(timeout=3.0)  # Reduced to 3 seconds since we're more responsive
-            if t.is_alive():
-                print(f"Warning: Thread {i+1} did not finish cleanly")
-        
-        # Additional cleanup - ensure video writer is closed
-        print("Finalizing video file...")
-        with self._write_lock:
-            if self.video_writer is not None:
-                print("Video writer cleanup in main thread")
-                try:
-                    if self.video_writer.isOpened():
-                        self.video_writer.release()
-                except Exception as e:
-                    print(f"Error in final video writer cleanup: {e}")
-                finally:
-                    self.video_writer = None
-        
-        # Clean up camera
-        if self.camera:
-            try:
-                self.camera.stop()
-                print("Camera stopped successfully")
-            except Exception as e:
-                print(f"Error stopping camera: {e}")
-            finally:
-                self.camera = None
-        
-        # Save metadata
+
+        # Signal the capture process to stop; this also wakes a paused capture loop
+        if not self.is_paused:
+            self._pauses[0] = time.perf_counter_ns()
+        self._set_state(STOPPED)
+        self.is_paused = False
+        self._stop_mouse_listener()
+
+        # Save the last buffered events
         try:
-            with open(self.metadata_file, 'w') as f:
-                json.dump(self.mouse_events, f, indent=4)
+            self._flush_mouse_events()
+            self._close_metadata_file()
             print(f"Metadata saved to {self.metadata_file}")
         except Exception as e:
             print(f"Error saving metadata: {e}")
-        
+
+        # The capture process releases the writer itself; give it time to finish the file
+        print("Finalizing video file...")
+        error = self._cleanup_resources()
+        if error:
+            print(f"Recording failed: {error}")
+        elif self.capture_file != self.video_file and not self._encode_capture_file():
+            error = "could not encode the video"
+
         # Reset state
         self.is_recording = False
         self.is_paused = False
-        self.mouse_events = []
-        self._threads = []
-        self.mouse_listener = None
-        
+        self._reset_mouse_events()
+
+        if error:
+            return False
         print("Recording stopped and all files saved.")
         return True
 
+    def _encode_capture_file(self):
+        """Encodes the lossless intermediate capture into the H.264 output video and deletes it."""
+        print("Encoding video...")
+        try:
+            codec, codec_args = pick_h264_encoder()
+            run_ffmpeg(["-i", self.capture_file, "-c:v", codec, *codec_args,
+                        "-pix_fmt", "yuv420p", self.video_file])
+            os.remove(self.capture_file)
+            return True
+        except (IOError, OSError) as e:
+            print(f"Error encoding video: {e}. The raw capture is kept at {self.capture_file}")
+            return False
+
+    def _set_state(self, state):
+        """Switches the recording state and wakes the capture process if it is waiting on it."""
+        with self._state_changed:
+            self._state.value = state
+            self._state_changed.notify_all()
+
     def _cleanup_resources(self):
-        """Safely releases camera and video writer."""
-        with self._write_lock:
-            if self.video_writer:
-                try:
-                    self.video_writer.release()
-                except:
-                    pass
-                self.video_writer = None
-                
-        if self.camera:
-            try:
-                self.camera.stop()
-            except:
-                pass
-            self.camera = None
+        """Waits for the capture process to exit, terminating it if it hangs; returns why it failed, or None."""
+        self._close_metadata_file()
+        if self.capture_process is None:
+            return None
+        self._set_state(STOPPED)
+        self.capture_process.join(timeout=CAPTURE_STOP_TIMEOUT)
+        if self.capture_process.is_alive():
+            print("Warning: Capture process did not finish cleanly; terminating it")
+            self.capture_process.terminate()
+            self.capture_process.join()
+        exitcode, self.capture_process = self.capture_process.exitcode, None
+        status_queue, self._status_queue = self._status_queue, None
+        if status_queue is None:
+            return None
+        try:
+            status, message = status_queue.get(timeout=1.0)
+        except queue.Empty:
+            status, message = "error", f"capture process exited with code {exitcode}"
+        return message if status == "error" else None
+
+    def _capture_alive(self):
+        """True while the capture process is still recording; it exits early if capture or encoding fails."""
+        if self.capture_process is not None and self.capture_process.is_alive():
+            return True
+        print("The capture process has stopped; stop the recording to see why")
+        return False
 
     def pause(self):
-        if self.is_recording and not self.is_paused:
+        if self.is_recording and not self.is_paused and self._capture_alive():
             self.is_paused = True
-            self._pause_event.clear()
+            # Stamped before the listener is joined, which can take a while
+            self._pauses[0] = time.perf_counter_ns()
+            self._set_state(PAUSED)
+            self._stop_mouse_listener()
             print("Recording paused.")
             return True
         return False
-            
+
     def resume(self):
-        if self.is_recording and self.is_paused:
+        if self.is_recording and self.is_paused and self._capture_alive():
             self.is_paused = False
-            self._pause_event.set()
+            # Paused time is not in the video, so it must not be in the event times either
+            paused = time.perf_counter_ns() - self._pauses[0]
+            self.start_time_ns += paused
+            self._pauses[1] += paused
+            self._set_state(RUNNING)
+            self._start_mouse_listener()
             print("Recording resumed.")
             return True
-        return False
\ No newline at end of file
+        return False
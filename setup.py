@@ -34,8 +34,8 @@ def main():
         ("dxcam", "dxcam"),
         ("pynput", "pynput"),
         ("moviepy", "moviepy"),
-        ("Pillow", "PIL"),
-        ("numpy", "numpy")
+        ("numpy", "numpy"),
+        ("scipy", "scipy")
     ]
     
     missing_packages = []